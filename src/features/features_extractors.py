@@ -14,11 +14,20 @@ Lin. alg. helpers:
 Contains linear algebra functions that I wasn't able to find in ASE.atoms documentation.
 """
 
+import functools
+import math
+import weakref
+
 import ase.atoms
 import numpy as np
 import pandas as pd
 from dynamic_factory import FuncFactory
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 import config.paths as PATHS
 import src.features.input_parsers as input_parsers
 import src.function_manipulators as function_manipulators
@@ -26,7 +35,13 @@ import src.function_manipulators as function_manipulators
 # Dataframe manipulators
 
 
+__checked_df_ids: set[int] = set()
+
+
 def __check_df(df: pd.DataFrame):
+    if id(df) in __checked_df_ids:
+        return
+
     if not isinstance(df, pd.DataFrame):
         raise ValueError("df should be pandas DataFrame object.")
 
@@ -36,10 +51,151 @@ def __check_df(df: pd.DataFrame):
     if len(df["obj"]) < 1:
         raise ValueError("'obj' column need at least one element but it is empty")
 
-    are_atoms_type = df["obj"].apply(lambda x: isinstance(x, ase.atoms.Atoms))
-    if not np.all(are_atoms_type):
+    if not all(isinstance(x, ase.atoms.Atoms) for x in df["obj"]):
         raise ValueError("Elements of 'obj' column should be ase.atoms.Atoms type")
 
+    __checked_df_ids.add(id(df))
+    weakref.finalize(df, __checked_df_ids.discard, id(df))
+
+
+def ensure_positions_soa(df: pd.DataFrame) -> np.ndarray:
+    """Stack positions of all particles into one contiguous
+    (n_particles, n_atoms, 3) float64 array and cache it in df.attrs,
+    so every feature can be computed with single numpy call
+    instead of python loop over particles.
+
+    Chemical symbols of first particle are cached next to it - all
+    particles are assumed to be the same molecule with perturbed
+    positions. Cache is rebuilt when df length changes.
+    """
+    positions = df.attrs.get("_pos_soa")
+    if positions is None or positions.shape[0] != len(df):
+        positions = np.ascontiguousarray(
+            np.stack([p.positions for p in df["obj"]], axis=0),
+            dtype=np.float64,
+        )
+        df.attrs["_pos_soa"] = positions
+        df.attrs["_symbols"] = tuple(df.loc[0, "obj"].get_chemical_symbols())
+    return positions
+
+
+def __row_norms(vectors: np.ndarray) -> np.ndarray:
+    # einsum + sqrt skips the LAPACK dispatch of np.linalg.norm,
+    # which dominates for thin (..., 3) arrays.
+    return np.sqrt(np.einsum("...i,...i->...", vectors, vectors))
+
+
+def __get_dst_values(positions: np.ndarray, idx1, idx2) -> np.ndarray:
+    return __row_norms(positions[:, idx1] - positions[:, idx2])
+
+
+# Numba compiles the angle/dihedral kernels into one parallel loop without
+# the intermediate arrays numpy allocates per operation. It is optional:
+# when not installed (or for small inputs, where JIT warmup would dominate)
+# the numpy expressions below are used instead.
+__NUMBA_MIN_ROWS = 200
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def __ang_kernel(positions, idx1, idx2, idx3):
+        out = np.empty(positions.shape[0])
+        for row in numba.prange(positions.shape[0]):
+            v1 = positions[row, idx1] - positions[row, idx2]
+            v2 = positions[row, idx3] - positions[row, idx2]
+            cos = (v1 @ v2) / math.sqrt((v1 @ v1) * (v2 @ v2))
+            out[row] = math.degrees(math.acos(min(1.0, max(-1.0, cos))))
+        return out
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def __dih_kernel(positions, idx1, idx2, idx3, idx4):
+        out = np.empty(positions.shape[0])
+        for row in numba.prange(positions.shape[0]):
+            v1 = positions[row, idx1] - positions[row, idx2]
+            axis = positions[row, idx3] - positions[row, idx2]
+            v2 = positions[row, idx4] - positions[row, idx3]
+            axis_u = axis / math.sqrt(axis @ axis)
+            v = v1 - (v1 @ axis_u) * axis_u
+            w = v2 - (v2 @ axis_u) * axis_u
+            cross = np.cross(axis_u, v)
+            out[row] = math.degrees(math.atan2(cross @ w, v @ w)) % 360.0
+        return out
+
+
+def __use_numba_kernel(positions: np.ndarray, idx) -> bool:
+    return (
+        numba is not None
+        and isinstance(idx, (int, np.integer))
+        and positions.shape[0] >= __NUMBA_MIN_ROWS
+    )
+
+
+def __get_ang_values(positions: np.ndarray, idx1, idx2, idx3) -> np.ndarray:
+    if __use_numba_kernel(positions, idx1):
+        return __ang_kernel(positions, idx1, idx2, idx3)
+    v1 = positions[:, idx1] - positions[:, idx2]
+    v2 = positions[:, idx3] - positions[:, idx2]
+    cos = (v1 * v2).sum(axis=-1) / (__row_norms(v1) * __row_norms(v2))
+    return np.degrees(cos_to_angle(cos))
+
+
+def __get_dih_values(positions: np.ndarray, idx1, idx2, idx3, idx4) -> np.ndarray:
+    # Same convention as ase.geometry.get_dihedrals: angle in degrees
+    # between projections of a1->a0 and a2->a3 onto plane normal to a1->a2.
+    if __use_numba_kernel(positions, idx1):
+        return __dih_kernel(positions, idx1, idx2, idx3, idx4)
+    v1 = positions[:, idx1] - positions[:, idx2]
+    axis = positions[:, idx3] - positions[:, idx2]
+    v2 = positions[:, idx4] - positions[:, idx3]
+    axis_u = axis / __row_norms(axis)[..., np.newaxis]
+    v = v1 - (v1 * axis_u).sum(axis=-1, keepdims=True) * axis_u
+    w = v2 - (v2 * axis_u).sum(axis=-1, keepdims=True) * axis_u
+    x = (v * w).sum(axis=-1)
+    y = (np.cross(axis_u, v) * w).sum(axis=-1)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def __get_plane_normals(positions: np.ndarray, plane_idxs) -> np.ndarray:
+    idx_0, idx_1, idx_2 = plane_idxs
+    v1 = positions[:, idx_0] - positions[:, idx_1]
+    v2 = positions[:, idx_2] - positions[:, idx_1]
+    return np.cross(v1, v2)
+
+
+def __get_benzene_dst_values(
+    positions: np.ndarray,
+    benzene1_idxs=(11, 14, 15, 16, 17, 20),
+    benzene2_idxs=(21, 24, 25, 26, 27, 30),
+) -> np.ndarray:
+    benzene1_centers = positions[:, np.array(benzene1_idxs)].mean(axis=1)
+    benzene2_centers = positions[:, np.array(benzene2_idxs)].mean(axis=1)
+    return __row_norms(benzene1_centers - benzene2_centers)
+
+
+def __get_benzene_cossq_values(
+    positions: np.ndarray,
+    benzene1_idxs=(14, 15, 16),
+    benzene2_idxs=(25, 26, 27),
+) -> np.ndarray:
+    normals1 = __get_plane_normals(positions, np.array(benzene1_idxs))
+    normals2 = __get_plane_normals(positions, np.array(benzene2_idxs))
+    cos = (normals1 * normals2).sum(axis=-1) / (
+        __row_norms(normals1) * __row_norms(normals2)
+    )
+    return cos**2
+
+
+__BENZENE_KERNELS = {
+    "benzene_dst": __get_benzene_dst_values,
+    "benzene_cossq": __get_benzene_cossq_values,
+}
+
+
+__GEOMETRIC_KERNELS = {
+    "dst": __get_dst_values,
+    "ang": __get_ang_values,
+    "dih": __get_dih_values,
+}
+
 @FuncFactory.register("ang")
 @function_manipulators.assert_proper_input("df", __check_df)
 def add_ang_feature(df: pd.DataFrame, idx1, idx2, idx3):
@@ -52,12 +208,7 @@ def add_ang_feature(df: pd.DataFrame, idx1, idx2, idx3):
         idx2 (int): atom index
         idx3 (int): atom index
     """
-    add_universal_feature(
-        df,
-        ase.Atoms.get_angle,
-        "ang",
-        *(idx1, idx2, idx3),
-    )
+    __add_geometric_feature(df, "ang", idx1, idx2, idx3)
 
 @FuncFactory.register("dih")
 @function_manipulators.assert_proper_input("df", __check_df)
@@ -72,12 +223,7 @@ def add_dih_feature(df: pd.DataFrame, idx1, idx2, idx3, idx4):
         idx3 (int): atom index
         idx4 (int): atom index
     """
-    add_universal_feature(
-        df,
-        ase.Atoms.get_dihedral,
-        "dih",
-        *(idx1, idx2, idx3, idx4),
-    )
+    __add_geometric_feature(df, "dih", idx1, idx2, idx3, idx4)
 
 
 @FuncFactory.register("dst")
@@ -91,12 +237,7 @@ def add_dst_feature(df: pd.DataFrame, idx1, idx2):
         idx1 (int): index of atom
         idx2 (int): index of atom
     """
-    add_universal_feature(
-        df,
-        ase.Atoms.get_distance,
-        "dst",
-        *(idx1, idx2),
-    )
+    __add_geometric_feature(df, "dst", idx1, idx2)
 
 @FuncFactory.register("benzene_dst")
 @function_manipulators.assert_proper_input("df", __check_df)
@@ -113,10 +254,9 @@ def add_benzene_dst_feature(
         benzene1_idxs (tuple[int*6]): all indexes of first benzene
     benzene2_idxs (tuple[int*6]): all indexes of second benzene
     """
-    benzene1_idxs = np.array(benzene1_idxs)
-    benzene2_idxs = np.array(benzene2_idxs)
-    df["benzene_dst"] = df["obj"].apply(
-        lambda p: get_benzene_dst(p, benzene1_idxs, benzene2_idxs)
+    positions = ensure_positions_soa(df)
+    df["benzene_dst"] = __get_benzene_dst_values(
+        positions, benzene1_idxs, benzene2_idxs
     )
 
 
@@ -135,17 +275,87 @@ def add_benzene_cossq_feature(
         benzene1_idxs (tuple[int, int, int]): Three indices from benzene.
         benzene2_idxs (tuple[int, int, int]): Three indices from benzene.
     """
-    benzene1_idxs = np.array(benzene1_idxs)
-    benzene2_idxs = np.array(benzene2_idxs)
-    df["benzene_cossq"] = df["obj"].apply(
-        lambda p: cos_between_planes(p, benzene1_idxs, benzene2_idxs) ** 2
+    positions = ensure_positions_soa(df)
+    df["benzene_cossq"] = __get_benzene_cossq_values(
+        positions, benzene1_idxs, benzene2_idxs
     )
 
 
-def add_universal_feature(df, func, name_prefix: str, *idxs):
-    particle = df.loc[0, "obj"]
-    feature_name = f"{name_prefix}{generate_feature_id(particle, *idxs)}"
-    df[feature_name] = df["obj"].apply(lambda p: func(p, *idxs))
+@function_manipulators.assert_proper_input("df", __check_df)
+def add_features_batch(df: pd.DataFrame, specs):
+    """Calculate many features in single pass over positions tensor
+    and append them to dataframe.
+
+    Geometric features of one kind are computed as one stacked numpy call
+    and written back as one block, so positions are streamed through memory
+    once per kind instead of once per feature.
+
+    Args:
+        df (pd.DataFrame): df with ase.Atoms column named 'obj'
+        specs (list[tuple]): list of (kind, idxs) pairs where kind is one of
+            'dst', 'ang', 'dih', 'benzene_dst', 'benzene_cossq' and idxs
+            are atom indexes expected by given kind.
+    """
+    if not specs:
+        return
+    positions = ensure_positions_soa(df)
+
+    grouped: dict[str, list[tuple]] = {}
+    for kind, idxs in specs:
+        grouped.setdefault(kind, []).append(tuple(idxs))
+
+    names: list[str] = []
+    blocks: list[np.ndarray] = []
+    for kind, idx_groups in grouped.items():
+        if kind in __GEOMETRIC_KERNELS:
+            names += [
+                f"{kind}{generate_feature_id(df, *idxs)}"
+                for idxs in idx_groups
+            ]
+            stacked_idxs = np.array(idx_groups).T
+            blocks.append(__GEOMETRIC_KERNELS[kind](positions, *stacked_idxs))
+        elif kind in __BENZENE_KERNELS:
+            for idxs in idx_groups:
+                names.append(kind)
+                blocks.append(
+                    __BENZENE_KERNELS[kind](positions, *idxs)[:, np.newaxis]
+                )
+        else:
+            raise ValueError(f"Unknown feature kind: {kind}")
+
+    df[names] = np.hstack(blocks)
+
+
+class FeatureBuilder:
+    """Collects feature specs and appends all of them to dataframe
+    as one contiguous block when the with-statement exits, so pandas
+    consolidates its blocks once instead of once per feature.
+
+    Example:
+        with FeatureBuilder(df) as builder:
+            builder.add("dst", 1, 2)
+            builder.add("ang", 1, 2, 3)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.specs: list[tuple] = []
+
+    def add(self, kind: str, *idxs):
+        self.specs.append((kind, idxs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.specs:
+            add_features_batch(self.df, self.specs)
+
+
+def __add_geometric_feature(df: pd.DataFrame, kind: str, *idxs):
+    positions = ensure_positions_soa(df)
+    feature_name = f"{kind}{generate_feature_id(df, *idxs)}"
+    df[feature_name] = __GEOMETRIC_KERNELS[kind](positions, *idxs)
 
 
 def add_comment_feature(
@@ -188,7 +398,8 @@ def add_homolumo_feature(df: pd.DataFrame):
 def get_benzene_dst(particle: ase.atoms.Atoms, benzene1_idxs, benzene2_idxs):
     benzene1_center = np.mean(particle.positions[benzene1_idxs], axis=0)
     benzene2_center = np.mean(particle.positions[benzene2_idxs], axis=0)
-    return np.linalg.norm(benzene1_center - benzene2_center)
+    centers_diff = benzene1_center - benzene2_center
+    return math.sqrt(centers_diff @ centers_diff)
 
 
 def cos_between_planes(particle: ase.atoms.Atoms, plane1_idxs, plane2_idxs):
@@ -208,9 +419,25 @@ def get_particle_symbols(particle: ase.atoms.Atoms, *idxs):
     return [particle.get_chemical_symbols()[idx] for idx in idxs]
 
 
-def generate_feature_id(particle: ase.atoms.Atoms, *idxs, prefix: str = ""):
-    symbols = get_particle_symbols(particle, *idxs)
-    return prefix + "".join([f"{s}{idx}" for s, idx in zip(symbols, idxs)])
+def generate_feature_id(particle_or_df, *idxs, prefix: str = ""):
+    """Build feature id from chemical symbols at given indexes.
+
+    Accepts single ase.Atoms particle or dataframe with 'obj' column;
+    for dataframe, symbols cached by ensure_positions_soa are reused
+    instead of allocating new symbols list per call.
+    """
+    if isinstance(particle_or_df, pd.DataFrame):
+        symbols = particle_or_df.attrs.get("_symbols")
+        if symbols is None:
+            symbols = particle_or_df.loc[0, "obj"].get_chemical_symbols()
+    else:
+        symbols = particle_or_df.get_chemical_symbols()
+    return __build_feature_id(tuple(symbols), idxs, prefix)
+
+
+@functools.cache
+def __build_feature_id(symbols: tuple, idxs: tuple, prefix: str) -> str:
+    return prefix + "".join([f"{symbols[idx]}{idx}" for idx in idxs])
 
 
 # Lin. alg. helpers
@@ -218,7 +445,8 @@ def generate_feature_id(particle: ase.atoms.Atoms, *idxs, prefix: str = ""):
 
 def unit_vector(vector):
     """Returns the unit vector of the vector."""
-    return vector / np.linalg.norm(vector)
+    vector = np.asarray(vector)
+    return vector / math.sqrt(vector @ vector)
 
 
 def angle_between(v1, v2):
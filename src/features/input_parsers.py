@@ -1,15 +1,31 @@
 """This module contains functions used for input parsing.
 """
-import functools
+import io
+import json
+import mmap
+import os
+import pathlib
 import re
+import typing
 
 import ase
 import ase.io
 import joblib
+import numpy as np
 import pandas as pd
 
+import config.paths as PATHS
+
 __all__ = ["get_comments_df", "read_raw_data", "parse_feature_name"]
 
+_FEATURE_IDXS_PATTERN = re.compile(r"\d+")
+_FEATURE_ALIAS_PATTERN = re.compile(r"^[a-z_]+")
+
+_FIXED_COMMENT_COLUMNS = (
+    ["id", "total_energy", "fermi_energy", "1"]
+    + [f"energy_level_{i}" for i in range(140 - 4)]
+)
+
 
 def parse_feature_name(feature_signature: str) -> dict[str, tuple]:
     """Parses feature name into dict that store function alias
@@ -23,14 +39,21 @@ def parse_feature_name(feature_signature: str) -> dict[str, tuple]:
             alias store feature name
             atoms_idxs store idxs used in feature generation.
     """
-    args = re.findall(r"\d+", feature_signature)
-    feature_alias = re.match(r"^[a-z_]+", feature_signature).group()
+    args = _FEATURE_IDXS_PATTERN.findall(feature_signature)
+    feature_alias = _FEATURE_ALIAS_PATTERN.match(feature_signature).group()
     return {
         "signature": feature_signature,
         "alias": feature_alias,
         "atoms_idxs": tuple(int(arg) for arg in args)
     }
 
+class RawArrays(typing.NamedTuple):
+    """Raw dataset stripped down to the fields used by feature extractors."""
+    positions: np.ndarray
+    y: np.ndarray
+    symbols: list[str]
+
+
 def read_raw_data(
     particles_path: str, transports_path: str, cache_path: str
 ) -> pd.DataFrame:
@@ -45,15 +68,114 @@ def read_raw_data(
         pd.DataFrame: Data frame with two columns: 'obj', 'y'.
             obj contains ase.Atoms object and y floats from 0 to 1.
     """
-    @joblib.Memory(cache_path).cache
-    def cached_reader(particles_path, transport_path):
-        return pd.DataFrame({
-                "obj": ase.io.iread(particles_path),
-                "y": pd.read_csv(transport_path, header=None)[0],
-        })
-    return cached_reader(particles_path, transports_path)
-
-@functools.cache
+    arrays = read_raw_arrays(particles_path, transports_path, cache_path)
+    df = pd.DataFrame({
+            "obj": [
+                ase.Atoms(symbols=arrays.symbols, positions=positions)
+                for positions in arrays.positions
+            ],
+            "y": arrays.y,
+    })
+    df.attrs["_pos_soa"] = np.ascontiguousarray(
+        arrays.positions, dtype=np.float64
+    )
+    df.attrs["_symbols"] = tuple(arrays.symbols)
+    return df
+
+
+def read_raw_arrays(
+    particles_path: str, transports_path: str, cache_path: str
+) -> RawArrays:
+    """Reads raw data as plain arrays, cached as .npy files.
+
+    Positions tensor and targets are stored as .npy (positions are
+    memory-mapped on load) and symbols as json - this loads much faster
+    and takes less memory than unpickling dataframe of ase.Atoms objects.
+
+    Args:
+        particles_path (str): Path to .xyz file with atoms definitions.
+        transports_path (str): Path to .trans file.
+        cache_path (str): Path where parsed data will be stored for future runs
+
+    Returns:
+        RawArrays: (n_particles, n_atoms, 3) positions tensor,
+            y targets and chemical symbols shared by all particles.
+    """
+    cache_dir = pathlib.Path(cache_path)
+    positions_file = cache_dir / "positions.npy"
+    y_file = cache_dir / "y.npy"
+    symbols_file = cache_dir / "symbols.json"
+
+    if not (
+        positions_file.exists() and y_file.exists() and symbols_file.exists()
+    ):
+        particles = _read_particles_parallel(particles_path)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        np.save(
+            positions_file, np.stack([p.positions for p in particles], axis=0)
+        )
+        np.save(
+            y_file, pd.read_csv(transports_path, header=None)[0].to_numpy()
+        )
+        symbols_file.write_text(
+            json.dumps(particles[0].get_chemical_symbols())
+        )
+
+    return RawArrays(
+        positions=np.load(positions_file, mmap_mode="r"),
+        y=np.load(y_file),
+        symbols=json.loads(symbols_file.read_text()),
+    )
+
+
+def _read_particles_parallel(path: str, n_jobs: int = -1) -> list[ase.Atoms]:
+    """Read all particles from xyz file, parsing chunks of frames
+    on all cores instead of serial ase.io.iread.
+    """
+    with open(path, encoding="utf-8") as f:
+        _advise_sequential_read(f)
+        text = f.read()
+
+    frames = _split_xyz_frames(text)
+    n_chunks = joblib.effective_n_jobs(n_jobs)
+    chunk_size = -(-len(frames) // n_chunks)
+    chunks = [
+        "".join(frames[i:i + chunk_size])
+        for i in range(0, len(frames), chunk_size)
+    ]
+    parsed_chunks = joblib.Parallel(n_jobs=n_jobs, backend="loky")(
+        joblib.delayed(_parse_xyz_chunk)(chunk) for chunk in chunks
+    )
+    return [particle for chunk in parsed_chunks for particle in chunk]
+
+
+def _advise_sequential_read(file_obj) -> None:
+    """Hint the kernel that the whole file will be read front to back,
+    so it can prefetch aggressively. No-op where fadvise is unavailable.
+    """
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(
+            file_obj.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL
+        )
+
+
+def _parse_xyz_chunk(text: str) -> list[ase.Atoms]:
+    return ase.io.read(io.StringIO(text), index=":", format="xyz")
+
+
+def _split_xyz_frames(text: str) -> list[str]:
+    lines = text.splitlines(keepends=True)
+    frames = []
+    line_num = 0
+    while line_num < len(lines):
+        if not lines[line_num].strip():
+            line_num += 1
+            continue
+        atoms_num = int(lines[line_num])
+        frames.append("".join(lines[line_num:line_num + atoms_num + 2]))
+        line_num += atoms_num + 2
+    return frames
+
 def get_comments_df(file_path: str) -> pd.DataFrame:
     """Load and parse xyz file. This is not general purpose function!
     It is designed to work with xyz file that contains:
@@ -64,6 +186,10 @@ def get_comments_df(file_path: str) -> pd.DataFrame:
         - unimportant '1'
         - 136 energy levels
         - 150 electron states
+
+    Parsed result is cached on disk keyed on file path and modification
+    time, so it survives process restarts.
+
     Args:
         file_path (str): path to xyz file to parse.
 
@@ -71,27 +197,44 @@ def get_comments_df(file_path: str) -> pd.DataFrame:
         pd.DataFrame: Datframe with parsed comments in rows
             and columns identical as in the list above.
     """
+    return _parse_comments(str(file_path), os.path.getmtime(file_path))
+
+
+@joblib.Memory(PATHS.FEATURES_CACHE, verbose=0).cache
+def _parse_comments(file_path: str, mtime: float) -> pd.DataFrame:
     comments = _load_lines_after_specified_one(file_path, "42\n")
-    comments_df = pd.Series(comments).str.split(expand=True).astype(float)
+    flat = np.fromstring(" ".join(comments), sep=" ", dtype=np.float64)
+    comments_df = pd.DataFrame(flat.reshape(len(comments), -1))
 
-    column_names = (
-        ["id", "total_energy", "fermi_energy", "1"]
-        + [f"energy_level_{i}" for i in range(140 - 4)]
-        + [f"electron_state_{i}" for i in range(len(comments_df.columns) - 140)]
-    )
-    comments_df.columns = column_names
+    comments_df.columns = _FIXED_COMMENT_COLUMNS + [
+        f"electron_state_{i}" for i in range(len(comments_df.columns) - 140)
+    ]
     return comments_df
 
 
 def _load_lines_after_specified_one(path: str, specified_line: str) -> list[str]:
+    if os.path.getsize(path) == 0:
+        return []
+
+    separator = specified_line.rstrip("\n").encode("utf-8")
+    needle = b"\n" + separator + b"\n"
     comments = []
-    next_line_is_comment = False
 
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            if next_line_is_comment:
-                comments.append(line.strip())
-            next_line_is_comment = line == specified_line
+    with open(path, "rb") as f:
+        _advise_sequential_read(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(separator) + 1] == separator + b"\n":
+                end = mm.find(b"\n", len(separator) + 1)
+                end = end if end >= 0 else len(mm)
+                comments.append(mm[len(separator) + 1:end].decode("utf-8"))
+
+            pos = 0
+            while (pos := mm.find(needle, pos)) >= 0:
+                start = pos + len(needle)
+                end = mm.find(b"\n", start)
+                end = end if end >= 0 else len(mm)
+                comments.append(mm[start:end].decode("utf-8"))
+                pos = end
     return comments
 
 
@@ -5,12 +5,13 @@ from typing import Callable
 
 def assert_proper_input(arg_name: str, arg_checker: Callable):
     def get_decorator(func):
+        arg_idx = __find_arg_index(func, arg_name)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             if arg_name in kwargs:
                 arg = kwargs[arg_name]
             else:
-                arg_idx = __find_arg_index(func, arg_name)
                 if arg_idx is None or len(args) <= arg_idx:
                     raise ValueError(f'{arg_name} argument is not provided')
                 arg = args[arg_idx]
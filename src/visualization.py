@@ -2,17 +2,27 @@
 """
 
 
+import weakref
+
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
 
-def draw_correlation_matrix(corr_matrix: pd.DataFrame, ax: mpl.axes.Axes):
+def draw_correlation_matrix(
+    corr_matrix: pd.DataFrame,
+    ax: mpl.axes.Axes,
+    max_annotated_cells: int = 400,
+):
     """Draw correlation matrix on given axis.
 
     Args:
         corr_matrix (pd.DataFrame): Correlation matrix - it don't need to be square.
         ax (mpl.axes.Axes): matplotlib axes object.
+        max_annotated_cells (int): Coefficient texts are skipped when matrix
+            has more cells than that - they would be unreadable anyway
+            and creating them dominates drawing time for big matrices.
 
     Example:
         corr_matrix = df.corr(numeric_only=False)
@@ -20,34 +30,111 @@ def draw_correlation_matrix(corr_matrix: pd.DataFrame, ax: mpl.axes.Axes):
         visualization.draw_correlation_matrix(corr_matrix, ax)
         plt.show()
     """
-    col_num = len(corr_matrix.columns)
-    row_num = len(corr_matrix.index)
+    draw_correlation_matrix_arr(
+        corr_matrix.values,
+        corr_matrix.columns.astype(str).to_numpy(),
+        corr_matrix.index.astype(str).to_numpy(),
+        ax,
+        max_annotated_cells,
+    )
+
+
+def draw_correlation_matrix_arr(
+    values: np.ndarray,
+    xlabels: np.ndarray,
+    ylabels: np.ndarray,
+    ax: mpl.axes.Axes,
+    max_annotated_cells: int = 400,
+):
+    """Array-level variant of draw_correlation_matrix.
+
+    Takes the raw 2D matrix and label arrays directly, so callers that
+    already hold numpy data skip the pandas layer entirely.
+
+    Args:
+        values (np.ndarray): 2D matrix of correlation coefficients.
+        xlabels (np.ndarray): labels for matrix columns.
+        ylabels (np.ndarray): labels for matrix rows.
+        ax (mpl.axes.Axes): matplotlib axes object.
+        max_annotated_cells (int): same meaning as in
+            draw_correlation_matrix.
+    """
+    row_num, col_num = values.shape
 
-    # plot a heatmap of the correlation matrix
-    im = ax.imshow(corr_matrix.values, cmap="coolwarm")
+    # plot a heatmap of the correlation matrix; a QuadMesh redraws much
+    # cheaper than the imshow image path. Cell edges are shifted by 0.5
+    # so cell centers stay at integer coordinates like with imshow.
+    # correlations live in [-1, 1], so float32 keeps all visible precision
+    # at half the upload bandwidth, and fixed vmin/vmax skip the autoscale
+    # pass over the buffer
+    im = ax.pcolormesh(
+        np.arange(col_num + 1) - 0.5,
+        np.arange(row_num + 1) - 0.5,
+        values.astype(np.float32, copy=False),
+        cmap="coolwarm",
+        shading="flat",
+        antialiased=False,
+        vmin=-1.0,
+        vmax=1.0,
+    )
+    # set orientation explicitly (invert_yaxis would toggle on redraw)
+    ax.set_ylim(row_num - 0.5, -0.5)
+    ax.set_aspect("equal")
+    # heatmap already fixed the data limits; texts don't need to update them
+    ax.set_autoscale_on(False)
+
+    # add the color bar before any annotations, so its layout pass only
+    # has to measure the mesh
+    ax.figure.colorbar(im, ax=ax)
+    ax.set_title("Correlation Heatmap")
 
     # add the column names as tick labels
-    ax.set_xticks(range(col_num))
-    ax.set_yticks(range(row_num))
-    ax.set_xticklabels(corr_matrix.columns, rotation=90)
-    ax.set_yticklabels(corr_matrix.index)
+    ax.set_xticks(range(col_num), labels=xlabels, rotation=90)
+    ax.set_yticks(range(row_num), labels=ylabels)
 
-    plt.grid(False)
+    ax.grid(False)
 
     # add the correlation coefficients as text annotations
-    for i in range(row_num):
-        for j in range(col_num):
-            ax.text(
-                j,
-                i,
-                round(corr_matrix.values[i, j], 2),
-                ha="center",
-                va="center",
-                color="black",
-            )
-
-    # add a color bar
-    ax.figure.colorbar(im, ax=ax)
+    if row_num * col_num > max_annotated_cells:
+        return
+    # output of df.corr() is symmetric, so for square matrices annotating
+    # the upper triangle is enough - colors still mirror the lower half
+    upper_triangle_only = (
+        row_num == col_num and np.array_equal(xlabels, ylabels)
+    )
+    labels = __get_cell_labels(values)
+    if upper_triangle_only:
+        labels = labels.copy()
+        labels[np.tril_indices(row_num, k=-1)] = ""
 
-    # set the title and show the plot
-    ax.set_title("Correlation Heatmap")
+    # one Table artist draws all cell texts in a single pass, instead of
+    # row_num * col_num independently laid out Text artists
+    table = ax.table(cellText=labels, cellLoc="center", bbox=[0, 0, 1, 1])
+    table.auto_set_font_size(False)
+    # annotations follow the data area, so later layout passes can skip them
+    table.set_in_layout(False)
+    for cell in table.get_celld().values():
+        cell.set_facecolor("none")
+        cell.set_edgecolor("none")
+
+
+__label_cache: dict[int, np.ndarray] = {}
+
+
+def __get_cell_labels(values: np.ndarray) -> np.ndarray:
+    """Format cell labels once per matrix and reuse them across redraws.
+
+    Formatting with %.2f rounds on the fly, so the whole matrix goes from
+    floats to ready-to-draw strings in one np.char.mod call. Cache is
+    keyed on the address of the underlying buffer (which stays the same
+    across .values views of one dataframe); entries are dropped when the
+    array owning the buffer is garbage collected.
+    """
+    key = values.__array_interface__["data"][0]
+    labels = __label_cache.get(key)
+    if labels is None:
+        labels = np.char.mod("%.2f", values)
+        buffer_owner = values.base if values.base is not None else values
+        weakref.finalize(buffer_owner, __label_cache.pop, key, None)
+        __label_cache[key] = labels
+    return labels